@@ -5,9 +5,17 @@ This module contains functions for loading, cleaning, and analyzing
 air quality data from an Italian city monitoring station.
 """
 
+import os
+from functools import lru_cache
+
 import pandas as pd
 import numpy as np
 
+# Version of the cleaned data layout, part of the parquet cache file name;
+# bump this whenever clean_data changes what it produces so stale caches
+# are not reused
+CACHE_VERSION = 1
+
 
 def load_data(file_path="data/AirQualityUCI.csv"):
     """
@@ -20,8 +28,11 @@ def load_data(file_path="data/AirQualityUCI.csv"):
         pd.DataFrame: Loaded dataset
     """
     try:
-        # Load data with semicolon separator
-        df = pd.read_csv(file_path, sep=';')
+        # Load data with semicolon separator, comma decimal separator and
+        # -200 as the missing data indicator so numeric columns parse as floats;
+        # Arrow-backed columns avoid object arrays for the raw Date/Time strings
+        df = pd.read_csv(file_path, sep=';', decimal=',', na_values=[-200],
+                         dtype_backend='pyarrow')
         
         # Remove empty columns (the dataset has trailing semicolons)
         df = df.dropna(axis=1, how='all')
@@ -48,41 +59,98 @@ def clean_data(df):
     if df is None:
         return None
     
-    # Create a copy to avoid modifying the original
-    df_clean = df.copy()
+    # Convert date and time columns
+    dates = pd.to_datetime(df['Date'], format='%d/%m/%Y')
+    time_parsed = pd.to_datetime(df['Time'], format='%H.%M.%S')
     
-    # Replace -200 values (missing data indicator) with NaN
-    df_clean = df_clean.replace(-200, np.nan)
+    # Create datetime column for easier time series analysis by adding the
+    # time of day to the date (NaT wherever either Date or Time is missing)
+    time_of_day = time_parsed - time_parsed.dt.normalize()
     
-    # Convert date and time columns
-    df_clean['Date'] = pd.to_datetime(df_clean['Date'], format='%d/%m/%Y')
-    df_clean['Time'] = pd.to_datetime(df_clean['Time'], format='%H.%M.%S').dt.time
-    
-    # Create datetime column for easier time series analysis
-    # Only create DateTime for rows where both Date and Time are valid
-    valid_datetime_mask = df_clean['Date'].notna() & df_clean['Time'].notna()
-    df_clean['DateTime'] = pd.NaT
-    
-    if valid_datetime_mask.any():
-        df_clean.loc[valid_datetime_mask, 'DateTime'] = pd.to_datetime(
-            df_clean.loc[valid_datetime_mask, 'Date'].astype(str) + ' ' + 
-            df_clean.loc[valid_datetime_mask, 'Time'].astype(str)
-        )
-    
-    # Convert numeric columns, handling comma as decimal separator
-    numeric_columns = ['CO(GT)', 'PT08.S1(CO)', 'NMHC(GT)', 'C6H6(GT)', 
-                      'PT08.S2(NMHC)', 'NOx(GT)', 'PT08.S3(NOx)', 'NO2(GT)', 
-                      'PT08.S4(NO2)', 'PT08.S5(O3)', 'T', 'RH', 'AH']
-    
-    for col in numeric_columns:
-        if col in df_clean.columns:
-            # Replace comma with dot for decimal separator
-            df_clean[col] = df_clean[col].astype(str).str.replace(',', '.')
-            df_clean[col] = pd.to_numeric(df_clean[col], errors='coerce')
+    # Downcast sensor and weather columns to float32 to halve their memory
+    numeric_columns = [col for col in ['CO(GT)', 'PT08.S1(CO)', 'NMHC(GT)', 'C6H6(GT)',
+                                       'PT08.S2(NMHC)', 'NOx(GT)', 'PT08.S3(NOx)', 'NO2(GT)',
+                                       'PT08.S4(NO2)', 'PT08.S5(O3)', 'T', 'RH', 'AH']
+                       if col in df.columns]
+    
+    # Build the converted columns into a new frame, leaving the input untouched
+    df_clean = df.assign(
+        Date=dates,
+        Time=time_parsed.dt.time,
+        DateTime=dates + time_of_day,
+        **{col: df[col].astype('float32') for col in numeric_columns}
+    )
+    
+    # Remember the numeric columns so consumers can skip select_dtypes
+    df_clean.attrs['numeric_cols'] = tuple(numeric_columns)
+    
+    return df_clean
+
+
+def load_cached_data(file_path="data/AirQualityUCI.csv", cache_path=None):
+    """
+    Load the cleaned dataset, using a parquet cache next to the CSV file.
+    
+    The cache file name includes CACHE_VERSION, so caches written for an
+    older layout are never read. The cache is reused only when it is newer
+    than the CSV file; otherwise the CSV is parsed and cleaned again and the
+    cache is rewritten.
+    
+    Args:
+        file_path (str): Path to the CSV file
+        cache_path (str): Path to the parquet cache file, before the version
+            is added (defaults to the CSV path with a .parquet extension)
+        
+    Returns:
+        pd.DataFrame: Cleaned dataset
+    """
+    if cache_path is None:
+        cache_path = os.path.splitext(file_path)[0] + '.parquet'
+    
+    cache_root, cache_ext = os.path.splitext(cache_path)
+    cache_path = f"{cache_root}.v{CACHE_VERSION}{cache_ext or '.parquet'}"
+    
+    try:
+        if (os.path.exists(cache_path) and os.path.exists(file_path) and
+                os.path.getmtime(cache_path) >= os.path.getmtime(file_path)):
+            return pd.read_parquet(cache_path)
+    except Exception as e:
+        print(f"Error reading cache {cache_path}: {e}")
+    
+    df_clean = clean_data(load_data(file_path))
+    
+    if df_clean is not None:
+        try:
+            df_clean.to_parquet(cache_path, compression='zstd')
+        except Exception as e:
+            # The cache is only an optimisation (e.g. pyarrow may be missing)
+            print(f"Error writing cache {cache_path}: {e}")
     
     return df_clean
 
 
+def get_numeric_columns(df):
+    """
+    Get the numeric column names of a dataset.
+    
+    Uses the column list recorded by clean_data when available and falls
+    back to inspecting the column dtypes otherwise.
+    
+    Args:
+        df (pd.DataFrame): Dataset
+        
+    Returns:
+        list: Numeric column names
+    """
+    numeric_cols = df.attrs.get('numeric_cols')
+    
+    if numeric_cols is None:
+        return df.select_dtypes(include=[np.number]).columns.tolist()
+    
+    # Derived frames inherit attrs, so keep only the columns still present
+    return [col for col in numeric_cols if col in df.columns]
+
+
 def get_data_summary(df):
     """
     Get basic summary statistics for the dataset.
@@ -102,8 +170,8 @@ def get_data_summary(df):
             'start': df['Date'].min(),
             'end': df['Date'].max()
         },
-        'missing_data_percentage': (df.isnull().sum() / len(df) * 100).round(2),
-        'numeric_columns': df.select_dtypes(include=[np.number]).columns.tolist()
+        'missing_data_percentage': df.isna().mean().mul(100).round(2),
+        'numeric_columns': get_numeric_columns(df)
     }
     
     return summary
@@ -171,6 +239,62 @@ def calculate_air_quality_metrics(df):
     return metrics
 
 
+def calculate_correlation_matrix(df):
+    """
+    Calculate the correlation matrix of the numeric columns.
+    
+    Args:
+        df (pd.DataFrame): Cleaned dataset
+        
+    Returns:
+        pd.DataFrame: Correlation matrix, or None if there are fewer than
+            two numeric columns
+    """
+    if df is None:
+        return None
+    
+    numeric_cols = get_numeric_columns(df)
+    
+    if len(numeric_cols) < 2:
+        return None
+    
+    # Pairwise-complete Pearson correlation computed with float32 matrix
+    # products: each pair uses only the rows where both columns are present
+    values = df[numeric_cols].to_numpy(dtype=np.float32)
+    valid = ~np.isnan(values)
+    mask = valid.astype(np.float32)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Centre each column on its mean to keep the float32 sums well conditioned
+        means = np.where(valid, values, 0).sum(axis=0) / mask.sum(axis=0)
+        centred = np.where(valid, values - means, 0).astype(np.float32)
+        
+        counts = mask.T @ mask
+        sums = centred.T @ mask
+        squares = (centred * centred).T @ mask
+        cov = centred.T @ centred - sums * sums.T / counts
+        var = squares - sums * sums / counts
+        corr = cov / np.sqrt(var * var.T)
+    
+    corr[counts < 2] = np.nan
+    
+    return pd.DataFrame(np.clip(corr, -1, 1), index=numeric_cols, columns=numeric_cols)
+
+
+@lru_cache(maxsize=32)
+def _parse_date(date):
+    """
+    Parse a date bound once and reuse it on later calls.
+    
+    Args:
+        date: Date as a string or date-like object
+        
+    Returns:
+        np.datetime64: Parsed date
+    """
+    return np.datetime64(pd.Timestamp(date))
+
+
 def filter_by_date_range(df, start_date=None, end_date=None):
     """
     Filter dataset by date range.
@@ -186,15 +310,20 @@ def filter_by_date_range(df, start_date=None, end_date=None):
     if df is None:
         return None
     
-    df_filtered = df.copy()
+    if not start_date and not end_date:
+        return df
+    
+    # Compare the raw datetime64 values against both bounds and index once
+    dates = df['Date'].to_numpy()
+    mask = np.ones(len(dates), dtype=bool)
     
     if start_date:
-        df_filtered = df_filtered[df_filtered['Date'] >= pd.to_datetime(start_date)]
+        mask &= dates >= _parse_date(start_date)
     
     if end_date:
-        df_filtered = df_filtered[df_filtered['Date'] <= pd.to_datetime(end_date)]
+        mask &= dates <= _parse_date(end_date)
     
-    return df_filtered
+    return df[mask]
 
 
 def get_daily_averages(df):
@@ -210,7 +339,32 @@ def get_daily_averages(df):
     if df is None:
         return None
     
-    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-    daily_avg = df.groupby('Date')[numeric_cols].mean().reset_index()
+    numeric_cols = get_numeric_columns(df)
+    
+    # Work on the rows with a valid date, ordered by date so that each day is
+    # a contiguous block (the dataset is already chronological)
+    has_date = df['Date'].notna().to_numpy()
+    dates = df['Date'].to_numpy()[has_date]
+    values = df[numeric_cols].to_numpy(dtype=np.float32)[has_date]
+    
+    if not (dates[1:] >= dates[:-1]).all():
+        order = np.argsort(dates, kind='stable')
+        dates = dates[order]
+        values = values[order]
+    
+    if len(dates) == 0:
+        return pd.DataFrame(columns=['Date'] + numeric_cols)
+    
+    # Reduce every day block of all columns in one pass, skipping missing values
+    day_starts = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1]])
+    valid = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(valid, values, 0), day_starts, axis=0)
+    counts = np.add.reduceat(valid, day_starts, axis=0, dtype=np.float32)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = sums / counts
+    
+    daily_avg = pd.DataFrame(means, columns=numeric_cols)
+    daily_avg.insert(0, 'Date', dates[day_starts])
     
     return daily_avg
@@ -7,8 +7,8 @@ Students will work in teams to enhance this dashboard through Git collaboration.
 
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-from analysis import load_data, clean_data, get_data_summary, calculate_air_quality_metrics
+from analysis import (load_cached_data, get_data_summary, calculate_air_quality_metrics,
+                      calculate_correlation_matrix)
 from visualize import (plot_co_over_time, plot_temperature_vs_humidity, 
                       plot_pollutant_distribution, plot_correlation_heatmap,
                       plot_nox_vs_sensor, create_summary_metrics_display)
@@ -45,6 +45,48 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Cached plots: figures are rebuilt only when the data changes, not on every
+# widget interaction. cache_data hands each session its own unpickled copy,
+# since matplotlib figures must not be rendered from several threads at once.
+@st.cache_data(show_spinner=False)
+def cached_co_over_time(df):
+    """Build the CO over time plot."""
+    return plot_co_over_time(df)
+
+
+@st.cache_data(show_spinner=False)
+def cached_temperature_vs_humidity(df):
+    """Build the temperature vs absolute humidity plot."""
+    return plot_temperature_vs_humidity(df)
+
+
+@st.cache_data(show_spinner=False)
+def cached_pollutant_distribution(df, pollutant):
+    """Build the distribution plot for a pollutant."""
+    return plot_pollutant_distribution(df, pollutant)
+
+
+@st.cache_data(show_spinner=False)
+def cached_nox_vs_sensor(df):
+    """Build the NOx(GT) vs sensor reading plot."""
+    return plot_nox_vs_sensor(df)
+
+
+# The correlation matrix depends only on the data, so it is cached on its own
+# and the heatmap is keyed on the small matrix rather than the full frame.
+# The matrix is shared by all sessions and must be treated as read-only.
+@st.cache_resource(show_spinner=False)
+def cached_correlation_matrix(df):
+    """Calculate the correlation matrix of the numeric columns."""
+    return calculate_correlation_matrix(df)
+
+
+@st.cache_data(show_spinner=False)
+def cached_correlation_heatmap(corr_matrix):
+    """Build the correlation heatmap from a correlation matrix."""
+    return plot_correlation_heatmap(None, corr_matrix=corr_matrix)
+
+
 def main():
     """Main application function."""
     
@@ -63,10 +105,7 @@ def main():
     @st.cache_data
     def load_and_clean_data():
         """Load and clean the air quality data."""
-        raw_data = load_data("data/AirQualityUCI.csv")
-        if raw_data is not None:
-            return clean_data(raw_data)
-        return None
+        return load_cached_data("data/AirQualityUCI.csv")
     
     # Load data
     with st.spinner("Loading air quality data..."):
@@ -76,6 +115,14 @@ def main():
         st.error("Could not load the air quality dataset. Please check if 'data/AirQualityUCI.csv' exists.")
         return
     
+    # Sidebar controls
+    st.sidebar.title("Dashboard Controls")
+    
+    pollutant = st.sidebar.selectbox(
+        "Select pollutant to visualize:",
+        ["CO(GT)", "C6H6(GT)", "NOx(GT)", "NO2(GT)", "T", "RH"]
+    )
+    
     # Key Metrics - KPI Boxes
     st.markdown('<h2 class="section-header">Key Metrics</h2>', unsafe_allow_html=True)
     
@@ -107,7 +154,7 @@ def main():
     
     with col1:
         st.subheader("CO Concentration Over Time")
-        co_plot = plot_co_over_time(df)
+        co_plot = cached_co_over_time(df)
         if co_plot:
             st.pyplot(co_plot)
         else:
@@ -115,7 +162,7 @@ def main():
     
     with col2:
         st.subheader("Temperature vs Absolute Humidity")
-        temp_humidity_plot = plot_temperature_vs_humidity(df)
+        temp_humidity_plot = cached_temperature_vs_humidity(df)
         if temp_humidity_plot:
             st.pyplot(temp_humidity_plot)
         else:
@@ -126,13 +173,13 @@ def main():
     
     with col3:
         st.subheader("CO Distribution")
-        co_dist_plot = plot_pollutant_distribution(df, 'CO(GT)')
+        co_dist_plot = cached_pollutant_distribution(df, 'CO(GT)')
         if co_dist_plot:
             st.pyplot(co_dist_plot)
     
     with col4:
         st.subheader("NOx(GT) vs Sensor Value")
-        nox_plot = plot_nox_vs_sensor(df)
+        nox_plot = cached_nox_vs_sensor(df)
         if nox_plot:
             st.pyplot(nox_plot)
         else:
@@ -140,29 +187,15 @@ def main():
     
     # Correlation heatmap
     st.subheader("Correlation Heatmap")
-    corr_plot = plot_correlation_heatmap(df)
+    corr_matrix = cached_correlation_matrix(df)
+    corr_plot = cached_correlation_heatmap(corr_matrix)
     if corr_plot:
         st.pyplot(corr_plot)
+    
+    # Pollutant selected in the sidebar
+    st.subheader("Selected Pollutant")
+    st.write(f"Currently showing data for: **{pollutant}**")
+    st.line_chart(df[pollutant])
 
 if __name__ == "__main__":
     main()
-
-import streamlit as st
-import pandas as pd
-import numpy as np
-
-st.sidebar.title("Dashboard Controls")
-
-pollutant = st.sidebar.selectbox(
-    "Select pollutant to visualize:",
-    ["CO(GT)", "C6H6(GT)", "NOx(GT)", "NO2(GT)", "T", "RH"]
-)
-
-st.title("Air Quality Dashboard")
-st.write(f"Currently showing data for: **{pollutant}**")
-
-# Load data (from analysis.py or directly)
-df = pd.read_csv("data/AirQualityUCI.csv", sep=';', decimal=',')
-df.replace(-200, np.nan, inplace=True)
-
-st.line_chart(df[pollutant])
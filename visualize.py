@@ -5,11 +5,92 @@ This module contains functions for creating charts and plots
 to visualize air quality data patterns and relationships.
 """
 
-import matplotlib.pyplot as plt
-import seaborn as sns
+import numpy as np
 import pandas as pd
 import streamlit as st
 
+from analysis import calculate_correlation_matrix
+
+# Line plots with more points than this are resampled to daily means;
+# hourly detail is not visible at the dashboard's figure widths anyway
+MAX_LINE_POINTS = 2000
+
+
+def _new_figure(figsize):
+    """
+    Create a figure with a single set of axes.
+    
+    The figure is created without pyplot, so it is never added to pyplot's
+    global figure registry and is freed once the caller drops it. matplotlib
+    (and seaborn, imported in plot_correlation_heatmap) are only loaded when
+    a chart is drawn, which keeps them off the app's cold start.
+    
+    Args:
+        figsize (tuple): Figure size in inches
+        
+    Returns:
+        tuple: The figure and its axes
+    """
+    from matplotlib.figure import Figure
+    
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    return fig, ax
+
+
+def _time_series_points(df, column, max_points=MAX_LINE_POINTS):
+    """
+    Get the points to plot for a column over time.
+    
+    Rows missing either DateTime or the value are skipped, and the series is
+    resampled to daily means if it has too many points to draw.
+    
+    Args:
+        df (pd.DataFrame): Cleaned dataset with DateTime column
+        column (str): Name of the value column
+        max_points (int): Maximum number of points to plot unchanged
+        
+    Returns:
+        tuple: Arrays of dates and values
+    """
+    mask = (df['DateTime'].notna() & df[column].notna()).to_numpy()
+    dates = df['DateTime'].to_numpy()[mask]
+    values = df[column].to_numpy()[mask]
+    
+    if len(values) <= max_points:
+        return dates, values
+    
+    daily = pd.Series(values, index=dates).resample('1D').mean().dropna()
+    return daily.index.to_numpy(), daily.to_numpy()
+
+
+def _scatter_colors(values, cmap_name):
+    """
+    Map values to colormap colors by quantizing them to colormap indices.
+    
+    Looking up integer indices directly in the colormap skips the per-point
+    normalization matplotlib would otherwise do for a float color array.
+    
+    Args:
+        values (np.ndarray): Values to color by
+        cmap_name (str): Name of the matplotlib colormap
+        
+    Returns:
+        tuple: RGBA color array and a ScalarMappable for the colorbar
+    """
+    from matplotlib import colormaps
+    from matplotlib.cm import ScalarMappable
+    from matplotlib.colors import Normalize
+    
+    cmap = colormaps[cmap_name]
+    vmin = values.min()
+    vmax = values.max()
+    scale = (cmap.N - 1) / (vmax - vmin) if vmax > vmin else 0
+    indices = ((values - vmin) * scale).astype(np.uint8)
+    
+    mappable = ScalarMappable(norm=Normalize(vmin=vmin, vmax=vmax), cmap=cmap)
+    return cmap(indices), mappable
+
 
 def plot_co_over_time(df, title="CO(GT) Concentration Over Time"):
     """
@@ -26,18 +107,15 @@ def plot_co_over_time(df, title="CO(GT) Concentration Over Time"):
         return None
     
     # Filter out missing values
-    plot_data = df[['DateTime', 'CO(GT)']].dropna()
-    
-    # Additional filter to remove NaT values from DateTime
-    plot_data = plot_data[plot_data['DateTime'].notna()]
+    dates, values = _time_series_points(df, 'CO(GT)')
     
-    if plot_data.empty:
+    if len(values) == 0:
         return None
     
-    fig, ax = plt.subplots(figsize=(12, 6))
+    fig, ax = _new_figure(figsize=(12, 6))
     
-    ax.plot(plot_data['DateTime'], plot_data['CO(GT)'], 
-            linewidth=1, alpha=0.7, color='#2E8B57')
+    ax.plot(dates, values, 
+            linewidth=1, alpha=0.7, color='#2E8B57', rasterized=True)
     
     ax.set_title(title, fontsize=16, fontweight='bold')
     ax.set_xlabel('Date', fontsize=12)
@@ -45,8 +123,8 @@ def plot_co_over_time(df, title="CO(GT) Concentration Over Time"):
     ax.grid(True, alpha=0.3)
     
     # Rotate x-axis labels for better readability
-    plt.xticks(rotation=45)
-    plt.tight_layout()
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
     
     return fig
 
@@ -71,11 +149,12 @@ def plot_temperature_vs_humidity(df, title="Temperature vs Absolute Humidity"):
     if plot_data.empty:
         return None
     
-    fig, ax = plt.subplots(figsize=(10, 6))
+    colors, mappable = _scatter_colors(plot_data['T'].to_numpy(dtype=np.float32), 'viridis')
     
-    scatter = ax.scatter(plot_data['T'], plot_data['AH'], 
-                        alpha=0.6, c=plot_data['T'], 
-                        cmap='viridis', s=20)
+    fig, ax = _new_figure(figsize=(10, 6))
+    
+    ax.scatter(plot_data['T'], plot_data['AH'], 
+               alpha=0.6, c=colors, s=20, rasterized=True)
     
     ax.set_title(title, fontsize=16, fontweight='bold')
     ax.set_xlabel('Temperature (°C)', fontsize=12)
@@ -83,10 +162,10 @@ def plot_temperature_vs_humidity(df, title="Temperature vs Absolute Humidity"):
     ax.grid(True, alpha=0.3)
     
     # Add colorbar
-    cbar = plt.colorbar(scatter, ax=ax)
+    cbar = fig.colorbar(mappable, ax=ax)
     cbar.set_label('Temperature (°C)', fontsize=10)
     
-    plt.tight_layout()
+    fig.tight_layout()
     
     return fig
 
@@ -107,17 +186,21 @@ def plot_pollutant_distribution(df, pollutant='CO(GT)', title=None):
         return None
     
     # Filter out missing values
-    plot_data = df[pollutant].dropna()
+    values = df[pollutant].to_numpy(dtype=np.float32)
+    values = values[~np.isnan(values)]
     
-    if plot_data.empty:
+    if values.size == 0:
         return None
     
     if title is None:
         title = f"Distribution of {pollutant}"
     
-    fig, ax = plt.subplots(figsize=(10, 6))
+    fig, ax = _new_figure(figsize=(10, 6))
     
-    ax.hist(plot_data, bins=50, alpha=0.7, color='#FF6B6B', edgecolor='black')
+    # Bin the values up front and draw the counts as bars
+    counts, edges = np.histogram(values, bins=50)
+    ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge',
+           alpha=0.7, color='#FF6B6B', edgecolor='black')
     
     ax.set_title(title, fontsize=16, fontweight='bold')
     ax.set_xlabel(f'{pollutant} Concentration', fontsize=12)
@@ -125,50 +208,49 @@ def plot_pollutant_distribution(df, pollutant='CO(GT)', title=None):
     ax.grid(True, alpha=0.3)
     
     # Add statistics text
-    mean_val = plot_data.mean()
-    median_val = plot_data.median()
+    mean_val = np.mean(values)
+    median_val = np.median(values)
     ax.axvline(mean_val, color='red', linestyle='--', 
                label=f'Mean: {mean_val:.2f}')
     ax.axvline(median_val, color='blue', linestyle='--', 
                label=f'Median: {median_val:.2f}')
     ax.legend()
     
-    plt.tight_layout()
+    fig.tight_layout()
     
     return fig
 
 
-def plot_correlation_heatmap(df, title="Air Quality Variables Correlation"):
+def plot_correlation_heatmap(df, title="Air Quality Variables Correlation", corr_matrix=None):
     """
     Create a correlation heatmap for numeric variables.
     
     Args:
-        df (pd.DataFrame): Cleaned dataset
+        df (pd.DataFrame): Cleaned dataset (may be None if corr_matrix is given)
         title (str): Chart title
+        corr_matrix (pd.DataFrame): Precomputed correlation matrix
+            (calculated from df if not given)
         
     Returns:
         matplotlib.figure.Figure: The plot figure
     """
-    if df is None:
-        return None
+    # Calculate correlation matrix of the numeric columns
+    if corr_matrix is None:
+        corr_matrix = calculate_correlation_matrix(df)
     
-    # Select only numeric columns
-    numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-    
-    if len(numeric_cols) < 2:
+    if corr_matrix is None:
         return None
     
-    # Calculate correlation matrix
-    corr_matrix = df[numeric_cols].corr()
+    import seaborn as sns
     
-    fig, ax = plt.subplots(figsize=(12, 10))
+    fig, ax = _new_figure(figsize=(12, 10))
     
     # Create heatmap
     sns.heatmap(corr_matrix, annot=True, cmap='coolwarm', center=0,
-                square=True, fmt='.2f', cbar_kws={'shrink': 0.8})
+                square=True, fmt='.2f', cbar_kws={'shrink': 0.8}, ax=ax)
     
     ax.set_title(title, fontsize=16, fontweight='bold')
-    plt.tight_layout()
+    fig.tight_layout()
     
     return fig
 
@@ -197,7 +279,7 @@ def plot_daily_averages(df, pollutant='CO(GT)', title=None):
     if title is None:
         title = f"Daily Average {pollutant} Concentration"
     
-    fig, ax = plt.subplots(figsize=(12, 6))
+    fig, ax = _new_figure(figsize=(12, 6))
     
     ax.plot(daily_avg['Date'], daily_avg[pollutant], 
             linewidth=2, marker='o', markersize=3, color='#4A90E2')
@@ -208,8 +290,8 @@ def plot_daily_averages(df, pollutant='CO(GT)', title=None):
     ax.grid(True, alpha=0.3)
     
     # Rotate x-axis labels
-    plt.xticks(rotation=45)
-    plt.tight_layout()
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
     
     return fig
 
@@ -238,18 +320,16 @@ def plot_multiple_pollutants(df, pollutants=None, title="Multiple Pollutants Ove
     if not available_pollutants:
         return None
     
-    fig, ax = plt.subplots(figsize=(12, 6))
+    fig, ax = _new_figure(figsize=(12, 6))
     
     colors = ['#2E8B57', '#FF6B6B', '#4A90E2', '#FFD93D', '#6A5ACD']
     
     for i, pollutant in enumerate(available_pollutants):
-        plot_data = df[['DateTime', pollutant]].dropna()
-        # Additional filter to remove NaT values from DateTime
-        plot_data = plot_data[plot_data['DateTime'].notna()]
-        if not plot_data.empty:
-            ax.plot(plot_data['DateTime'], plot_data[pollutant], 
+        dates, values = _time_series_points(df, pollutant)
+        if len(values) > 0:
+            ax.plot(dates, values, 
                    label=pollutant, linewidth=1.5, alpha=0.8,
-                   color=colors[i % len(colors)])
+                   color=colors[i % len(colors)], rasterized=True)
     
     ax.set_title(title, fontsize=16, fontweight='bold')
     ax.set_xlabel('Date', fontsize=12)
@@ -258,8 +338,8 @@ def plot_multiple_pollutants(df, pollutants=None, title="Multiple Pollutants Ove
     ax.grid(True, alpha=0.3)
     
     # Rotate x-axis labels
-    plt.xticks(rotation=45)
-    plt.tight_layout()
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
     
     return fig
 
@@ -284,11 +364,12 @@ def plot_nox_vs_sensor(df, title="NOx(GT) vs Sensor Reading"):
     if plot_data.empty:
         return None
     
-    fig, ax = plt.subplots(figsize=(10, 6))
+    colors, mappable = _scatter_colors(plot_data['NOx(GT)'].to_numpy(dtype=np.float32), 'Reds')
+    
+    fig, ax = _new_figure(figsize=(10, 6))
     
-    scatter = ax.scatter(plot_data['NOx(GT)'], plot_data['PT08.S3(NOx)'], 
-                        alpha=0.6, c=plot_data['NOx(GT)'], 
-                        cmap='Reds', s=20)
+    ax.scatter(plot_data['NOx(GT)'], plot_data['PT08.S3(NOx)'], 
+               alpha=0.6, c=colors, s=20, rasterized=True)
     
     ax.set_title(title, fontsize=16, fontweight='bold')
     ax.set_xlabel('NOx(GT) Concentration (µg/m³)', fontsize=12)
@@ -296,10 +377,10 @@ def plot_nox_vs_sensor(df, title="NOx(GT) vs Sensor Reading"):
     ax.grid(True, alpha=0.3)
     
     # Add colorbar
-    cbar = plt.colorbar(scatter, ax=ax)
+    cbar = fig.colorbar(mappable, ax=ax)
     cbar.set_label('NOx(GT) Concentration (µg/m³)', fontsize=10)
     
-    plt.tight_layout()
+    fig.tight_layout()
     
     return fig
 